@@ -1,5 +1,10 @@
 from table import Table
 from duck_client import DuckClient
+from remote_cache import RemoteCache, is_remote_path
+from table_stats import StatsStore, TableStats
+from data_files import read_data_file, file_source_id
+from work_queue import WorkQueue
+from distributed import cleanup_run
 import pandas as pd
 import json
 import os
@@ -160,7 +165,8 @@ def duckdb_to_iceberg(
     tables = conn.execute(
         "SELECT name FROM sqlite_master WHERE type='table'"
     ).fetchall()
-    tables = [table[0] for table in tables]
+    # Skip internal bookkeeping tables such as ingestion checkpoints
+    tables = [table[0] for table in tables if not table[0].startswith('_')]
     
     print(f"Found {len(tables)} tables in DuckDB database: {', '.join(tables)}")
     
@@ -247,6 +253,39 @@ def execute_python_file(file_path):
         traceback.print_exc()
         return False
 
+def load_remote_cache(controller_path='controller.yaml'):
+    """
+    Build the read-through cache for remote inputs from controller.yaml.
+    
+    Args:
+        controller_path (str): Path to the controller configuration
+        
+    Returns:
+        RemoteCache: Cache configured with the 'cache' and 's3' settings
+    """
+    controller = {}
+    if os.path.exists(controller_path):
+        with open(controller_path, 'r') as file:
+            controller = yaml.safe_load(file) or {}
+    
+    # The s3 block is a list of single-key mappings
+    s3_settings = {}
+    for item in controller.get('s3') or []:
+        s3_settings.update(item or {})
+    
+    cache_settings = controller.get('cache') or {}
+    return RemoteCache(
+        cache_dir=cache_settings.get('directory', 'cache'),
+        max_size_mb=cache_settings.get('max_size_mb', 1024),
+        credentials={
+            "aws_access_key": s3_settings.get('access_key'),
+            "aws_secret_key": s3_settings.get('secret_key'),
+            "endpoint_url": s3_settings.get('endpoint_url'),
+            "gcs_credentials": cache_settings.get('gcs_credentials'),
+            "azure_connection_string": cache_settings.get('azure_connection_string')
+        }
+    )
+
 # Load config file path from os
 config_path = os.environ.get('TABLE',None)
 if config_path!=None:
@@ -255,6 +294,10 @@ if config_path!=None:
 # Get the path from environment variable
 path = os.environ.get('EXECUTE', None)
 
+# Resolve remote inputs to a local cached copy
+if is_remote_path(path):
+    path = load_remote_cache().fetch(path)
+
 # Determine if it's a data file or SQL file
 data_path = path if path and any(('.json' in path.lower(),'.csv' in path.lower(),'.parquet' in path.lower())) else None
 sql_path = path if path and '.sql' in path.lower() else None
@@ -270,57 +313,68 @@ elif _db !=None:
 else:
     conn=None
 if config_path !=None:
+    # Column statistics are kept in the database, next to the data
+    stats_store = StatsStore(conn)
+    
     # Create table if not exists
     table = Table(
         name=config["name"],
         schema=config['schema_definition'],
-        primary_key=config["primary_key"],
-        error_behavior=config["error_behavior"]  # Try to convert invalid types
+        primary_key=config.get("primary_key"),
+        error_behavior=config["error_behavior"],  # Try to convert invalid types
+        indexes=config.get("indexes"),
+        cluster_by=config.get("cluster_by"),
+        stats_store=stats_store,
+        batch_size=config.get("batch_size", 10000)
     )
     if table.create(conn):
         print("Table created successfully!")
+        print(f"Index build time: {table.index_build_time:.3f}s")
 
 
-if data_path:
-    file_ext = os.path.splitext(data_path)[1].lower()
-    
-    if file_ext == '.json':
-        # Load JSON file
-        with open(data_path, 'r') as file:
-            data = json.load(file)
-    
-    elif file_ext == '.csv':
-        # Load CSV file
-        import pandas as pd
-        df = pd.read_csv(data_path)
-        data = df.to_dict(orient='records')
-    
-    elif file_ext == '.parquet':
-        # Load Parquet file
-        import pandas as pd
-        import pyarrow.parquet as pq
-        df = pd.read_parquet(data_path)
-        data = df.to_dict(orient='records')
-    
-    else:
-        print(f"Unsupported file format: {file_ext}")
-        data = []
+# Run id of shards processed by distributed workers, merged into the table
+shard_run = os.environ.get('SHARDS', None)
+
+if shard_run and config_path != None:
+    tasks = WorkQueue().results(shard_run)
+    loaded = 0
+    for task in tasks:
+        if task['status'] != 'done':
+            print(f"Skipping shard {task['payload']['data_path']}: {task['status']}")
+            continue
+        result = task['result']
+        try:
+            loaded += table.load_shard(
+                conn, result['shard_path'], result['source_id'], result['row_count'],
+                shard_stats=TableStats(result['stats'])
+            )
+        except Exception as e:
+            # Unmerged sources keep an incomplete checkpoint and are retried next run
+            print(f"Error merging shard {task['payload']['data_path']}: {e}")
+    print(f"Merged {loaded} rows from {len(tasks)} shards")
+    client.checkpoint()
+    cleanup_run(WorkQueue(), shard_run)
+elif data_path:
+    data = read_data_file(data_path)
     
     if data:
-        success, errors = table.insert(conn, data)
+        # Identify the file by name and content so a restarted run resumes it
+        success, errors = table.insert(conn, data, source_id=file_source_id(data_path))
         print(f"Inserted {success} rows, {errors} errors")
+        # Flush the bulk load out of the WAL
+        client.checkpoint()
     else:
         print("No data to insert")
 elif sql_path  and config_path != None:
     with open(sql_path, 'r') as file:
-        sql_string = file.read()
-        query = f"""
-        CREATE OR REPLACE TABLE {config['name']} AS (
-        {sql_string}
-        );
-        """
-        conn.execute(query)
+        sql_string = file.read().strip().rstrip(';')
+    try:
+        table.replace_with_query(conn, sql_string)
+        client.checkpoint()
         print("Record Count", conn.execute(f'SELECT COUNT(*) FROM {config["name"]}').fetchall()[0][0])
+    except duckdb.Error as e:
+        # The table is left unchanged, the query must return only schema_definition columns
+        print(f"Error materializing {sql_path} into {config['name']}: {e}")
 elif sql_path and _db != None:
     with open(sql_path, 'r') as file:
         sql_string = file.read()
@@ -330,6 +384,24 @@ elif python_path:
     r=execute_python_file(python_path)
     print("Success: ",r)
 
+if config_path != None:
+    for col_name, summary in table.stats.summary().items():
+        print(f"Stats {config['name']}.{col_name}: {summary}")
+
+if os.environ.get('MAINTENANCE') and conn != None:
+    before, after, compacted = client.maintain(
+        free_block_ratio=float(os.environ.get('FREE_BLOCK_RATIO', 0.3)),
+        interval_minutes=float(os.environ.get('COMPACT_INTERVAL_MINUTES', 0))
+    )
+    # Compaction reconnects the client
+    conn = client.conn
+    for label, metrics in (("Before", before), ("After", after)):
+        print(f"{label} maintenance: file {metrics['file_size']} bytes, "
+              f"WAL {metrics['wal_size']} bytes, "
+              f"{metrics['free_blocks']}/{metrics['total_blocks']} blocks free "
+              f"({metrics['free_block_ratio']:.1%})")
+    print("Compacted: ", compacted)
+
 if conn != None:
     conn.close()
     if config_path !=None:
@@ -0,0 +1,56 @@
+import hashlib
+import json
+import os
+
+
+DATA_EXTENSIONS = ('.json', '.csv', '.parquet')
+
+
+def read_data_file(data_path):
+    """
+    Load a JSON, CSV or Parquet file as a list of rows.
+
+    Args:
+        data_path (str): Path to the data file
+
+    Returns:
+        list: List of dictionaries containing column-value pairs
+    """
+    file_ext = os.path.splitext(data_path)[1].lower()
+
+    if file_ext == '.json':
+        # Load JSON file
+        with open(data_path, 'r') as file:
+            return json.load(file)
+
+    elif file_ext == '.csv':
+        # Load CSV file
+        import pandas as pd
+        df = pd.read_csv(data_path)
+        return df.to_dict(orient='records')
+
+    elif file_ext == '.parquet':
+        # Load Parquet file
+        import pandas as pd
+        df = pd.read_parquet(data_path)
+        return df.to_dict(orient='records')
+
+    print(f"Unsupported file format: {file_ext}")
+    return []
+
+
+def file_source_id(data_path):
+    """
+    Identify a data file by name and content, used for ingestion checkpoints.
+
+    Args:
+        data_path (str): Path to the data file
+
+    Returns:
+        str: '<file name>:<sha256 of the contents>'
+    """
+    digest = hashlib.sha256()
+    with open(data_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return f"{os.path.basename(data_path)}:{digest.hexdigest()}"
@@ -0,0 +1,360 @@
+import argparse
+import glob
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+import traceback
+
+import duckdb
+import yaml
+
+from data_files import read_data_file, file_source_id
+from duck_client import DuckClient
+from remote_cache import is_remote_path
+from table import Table, SOURCE_ROW
+from table_stats import TableStats
+from work_queue import WorkQueue
+
+
+SHARD_DIR = os.path.join("work", "shards")
+
+# Runs older than this were abandoned by a coordinator that never merged them
+STALE_RUN_SECONDS = 24 * 60 * 60
+
+# Column types written to shards as Arrow integers, floats and booleans,
+# any other column is written as text and cast by DuckDB on merge
+INTEGER_TYPES = ('TINYINT', 'SMALLINT', 'INT', 'BIGINT', 'UTINYINT', 'USMALLINT', 'UINTEGER')
+FLOAT_TYPES = ('FLOAT', 'REAL', 'DOUBLE', 'DECIMAL', 'NUMERIC')
+BOOLEAN_TYPES = ('BOOL',)
+
+
+def load_table(table_path):
+    """
+    Load a table YAML.
+
+    Returns:
+        tuple: (Table, configuration dictionary)
+    """
+    with open(table_path, 'r') as file:
+        config = yaml.safe_load(file)
+    table = Table(
+        name=config["name"],
+        schema=config['schema_definition'],
+        primary_key=config.get("primary_key"),
+        error_behavior=config["error_behavior"],
+        cluster_by=config.get("cluster_by")
+    )
+    return table, config
+
+
+def completed_sources(table, database):
+    """
+    Look up the sources already fully ingested into the target table,
+    reading the database without locking out other readers.
+
+    Args:
+        table (Table): Target table
+        database (str): Database name from the table YAML
+
+    Returns:
+        set: Identities of the fully ingested source files
+    """
+    db_path = DuckClient(database).db_path()
+    if not os.path.exists(db_path):
+        return set()
+    try:
+        conn = duckdb.connect(db_path, read_only=True)
+    except duckdb.Error as e:
+        # Another process holds the database, the merge still skips ingested sources
+        print(f"Warning: Couldn't read checkpoints from {db_path}, planning every file. Error: {e}")
+        return set()
+    try:
+        return table.completed_sources(conn)
+    finally:
+        conn.close()
+
+
+def arrow_schema(table):
+    """
+    Build the Arrow schema of a table's shards.
+
+    Args:
+        table (Table): Table the shard is loaded into
+
+    Returns:
+        tuple: (pyarrow.Schema, list of per column value converters)
+    """
+    import pyarrow as pa
+
+    fields, converters = [], []
+    for col_name, data_type in table.schema:
+        upper = data_type.upper()
+        if upper.startswith(INTEGER_TYPES) and not upper.startswith('INTERVAL'):
+            fields.append(pa.field(col_name, pa.int64()))
+            converters.append(int)
+        elif upper.startswith(FLOAT_TYPES):
+            fields.append(pa.field(col_name, pa.float64()))
+            converters.append(float)
+        elif upper.startswith(BOOLEAN_TYPES):
+            fields.append(pa.field(col_name, pa.bool_()))
+            converters.append(bool)
+        else:
+            fields.append(pa.field(col_name, pa.string()))
+            converters.append(str)
+    fields.append(pa.field(SOURCE_ROW, pa.int64()))
+    return pa.schema(fields), converters
+
+
+def plan(queue, run_id, table_path, execute_pattern):
+    """
+    Enqueue one task per data file matching the execute pattern,
+    except files already fully ingested into the table.
+
+    Args:
+        queue (WorkQueue): Shared work queue
+        run_id (str): Identifier of this step execution
+        table_path (str): Path to the table YAML
+        execute_pattern (str): Glob of data files, e.g. 'model/data/*.json'
+
+    Returns:
+        int: Number of tasks enqueued
+
+    Raises:
+        ValueError: If the execute pattern is a remote URI
+    """
+    if is_remote_path(execute_pattern):
+        raise ValueError(f"Distributed steps ingest local files, {execute_pattern} is remote. "
+                         f"Remove workers from the step to read it through the cache.")
+
+    table, config = load_table(table_path)
+    completed = completed_sources(table, config["database"])
+    files = []
+    for data_path in sorted(glob.glob(execute_pattern)):
+        if file_source_id(data_path) in completed:
+            print(f"Source {data_path} already ingested into {table.name}, skipping")
+        else:
+            files.append(data_path)
+    payloads = [
+        {
+            'table': table_path,
+            'data_path': data_path,
+            'output_dir': os.path.join(SHARD_DIR, run_id),
+        }
+        for data_path in files
+    ]
+    count = queue.enqueue(run_id, payloads)
+    print(f"Enqueued {count} shards for run {run_id}")
+    return count
+
+
+def process_shard(task_id, payload):
+    """
+    Validate one data file and write its rows to a Parquet shard.
+
+    Args:
+        task_id (int): Task identifier, used to name the shard
+        payload (dict): Task description from plan
+
+    Returns:
+        dict: Shard path, source identity, row counts and serialized stats
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table, _ = load_table(payload['table'])
+    schema, converters = arrow_schema(table)
+
+    data_path = payload['data_path']
+    data = read_data_file(data_path)
+
+    # Process rows according to schema and error_behavior, converting
+    # values to the shard's column types so one row cannot fail the shard
+    valid_rows = []
+    for i, row in enumerate(data):
+        try:
+            processed_row = table.process_row(row)
+            for (col_name, _), convert in zip(table.schema, converters):
+                value = processed_row[col_name]
+                if value is not None:
+                    processed_row[col_name] = convert(value)
+        except Exception as e:
+            if table.error_behavior == 'error':
+                raise
+            print(f"Skipping row due to error: {e}")
+            continue
+        processed_row[SOURCE_ROW] = i
+        valid_rows.append(processed_row)
+    valid_rows = table.cluster_rows(valid_rows)
+
+    stats = TableStats()
+    stats.update({k: v for k, v in row.items() if k != SOURCE_ROW} for row in valid_rows)
+
+    shard_path = None
+    if valid_rows:
+        os.makedirs(payload['output_dir'], exist_ok=True)
+        shard_path = os.path.join(payload['output_dir'], f"{task_id}.parquet")
+        tmp_path = f"{shard_path}.{os.getpid()}.tmp"
+        pq.write_table(pa.Table.from_pylist(valid_rows, schema=schema), tmp_path)
+        os.replace(tmp_path, shard_path)
+
+    return {
+        'shard_path': shard_path,
+        'source_id': file_source_id(data_path),
+        'row_count': len(data),
+        'valid_count': len(valid_rows),
+        'stats': stats.to_dict(),
+    }
+
+
+def cleanup_run(queue, run_id):
+    """
+    Delete a run's tasks and shard files once they are no longer needed.
+    Unmerged sources are not lost, they are re-planned by the next run
+    because their ingestion checkpoint is incomplete.
+
+    Args:
+        queue (WorkQueue): Shared work queue
+        run_id (str): Run identifier
+    """
+    shutil.rmtree(os.path.join(SHARD_DIR, run_id), ignore_errors=True)
+    queue.delete_run(run_id)
+
+
+def purge_stale_runs(queue, max_age_seconds=STALE_RUN_SECONDS):
+    """
+    Clean up runs left behind by coordinators that died before merging.
+
+    Args:
+        queue (WorkQueue): Shared work queue
+        max_age_seconds (float): Age after which a run is considered abandoned
+    """
+    for run_id in queue.stale_runs(max_age_seconds):
+        print(f"Removing stale run {run_id}")
+        cleanup_run(queue, run_id)
+
+
+def _renew_lease(queue, task_id, worker, stop):
+    """Keep renewing a task's lease until stop is set."""
+    while not stop.wait(queue.lease_seconds / 3):
+        if not queue.renew(task_id, worker):
+            print(f"[{worker}] Lost lease on task {task_id}")
+            return
+
+
+def work(queue, run_id=None, forever=False, poll_seconds=1.0):
+    """
+    Process tasks until the queue is drained.
+
+    Args:
+        queue (WorkQueue): Shared work queue
+        run_id (str): Only process tasks of this run, any run if None
+        forever (bool): Keep polling for new work instead of exiting
+        poll_seconds (float): Wait between polls when no task is available
+
+    Returns:
+        int: Number of tasks completed by this worker
+    """
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    completed = 0
+    while True:
+        task = queue.claim(worker, run_id)
+        if task is None:
+            # Other workers may still fail and re-queue their tasks
+            if not forever and queue.remaining(run_id) == 0:
+                break
+            time.sleep(poll_seconds)
+            continue
+
+        task_id, payload = task
+        start = time.time()
+
+        # Renew the lease while the shard is processed, so only a dead
+        # worker's task is taken over, after at most one lease period
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=_renew_lease, args=(queue, task_id, worker, stop), daemon=True)
+        heartbeat.start()
+        try:
+            result = process_shard(task_id, payload)
+        except Exception as e:
+            traceback.print_exc()
+            queue.fail(task_id, worker, str(e))
+            continue
+        finally:
+            stop.set()
+            heartbeat.join()
+
+        if queue.complete(task_id, worker, result):
+            completed += 1
+            print(f"[{worker}] Processed {payload['data_path']} "
+                  f"({result['valid_count']}/{result['row_count']} rows) in {time.time() - start:.2f}s")
+        else:
+            print(f"[{worker}] Lost lease on task {task_id}, result discarded")
+
+    print(f"[{worker}] Finished, {completed} tasks completed")
+    return completed
+
+
+def run(queue, run_id, table_path, execute_pattern, workers):
+    """
+    Enqueue the shards of a step and process them with local worker processes.
+    Workers on other hosts sharing the filesystem may join with the worker command.
+
+    Returns:
+        bool: True if every shard was processed
+    """
+    start = time.time()
+    purge_stale_runs(queue)
+    plan(queue, run_id, table_path, execute_pattern)
+
+    processes = [
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), 'worker',
+                          '--queue', queue.path, '--run-id', run_id])
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.wait()
+
+    # Wait for remote workers still holding tasks of this run
+    while queue.remaining(run_id):
+        time.sleep(1)
+
+    tasks = queue.results(run_id)
+    failed = [task for task in tasks if task['status'] != 'done']
+    rows = sum(task['result']['row_count'] for task in tasks if task['result'])
+    elapsed = time.time() - start
+    print(f"Processed {len(tasks) - len(failed)}/{len(tasks)} shards, {rows} rows "
+          f"in {elapsed:.2f}s with {workers} local workers")
+    for task in failed:
+        print(f"Shard {task['payload']['data_path']} failed: {task['error']}")
+    return not failed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Distributed execution of ingest steps")
+    parser.add_argument('command', choices=['plan', 'worker', 'run'])
+    parser.add_argument('--queue', default=os.path.join("work", "queue.db"), help="Path of the shared work queue")
+    parser.add_argument('--run-id', help="Identifier of the step execution, workers only take its tasks")
+    parser.add_argument('--table', help="Path to the table YAML")
+    parser.add_argument('--execute', help="Glob of data files to ingest")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Number of local workers")
+    parser.add_argument('--forever', action='store_true', help="Keep the worker polling for new tasks")
+    args = parser.parse_args()
+
+    queue = WorkQueue(args.queue)
+    if args.command == 'worker':
+        work(queue, run_id=args.run_id, forever=args.forever)
+    else:
+        if not (args.run_id and args.table and args.execute):
+            parser.error(f"{args.command} requires --run-id, --table and --execute")
+        try:
+            if args.command == 'plan':
+                plan(queue, args.run_id, args.table, args.execute)
+            elif not run(queue, args.run_id, args.table, args.execute, max(args.workers, 1)):
+                sys.exit(1)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(2)
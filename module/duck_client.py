@@ -1,5 +1,7 @@
 import duckdb
+import json
 import os
+import time
 
 class DuckClient:
     def __init__(self, db_name):
@@ -7,6 +9,18 @@ class DuckClient:
         self.conn = None
         self.db_dir = "duckdb"  # Directory for all DuckDB files
     
+    def db_path(self):
+        """
+        Path of the database file.
+        
+        Returns:
+            str: Path inside the DuckDB directory, with a .duckdb extension
+        """
+        # Add .duckdb extension if not present
+        if not self.db_name.endswith('.duckdb'):
+            return os.path.join(self.db_dir, f"{self.db_name}.duckdb")
+        return os.path.join(self.db_dir, self.db_name)
+    
     def connect(self):
         """
         Creates a new DuckDB database or connects to an existing one.
@@ -24,11 +38,7 @@ class DuckClient:
                 print(f"Warning: Couldn't create directory {self.db_dir}, using current directory. Error: {e}")
                 self.db_dir = "."
         
-        # Add .duckdb extension if not present
-        if not self.db_name.endswith('.duckdb'):
-            db_path = os.path.join(self.db_dir, f"{self.db_name}.duckdb")
-        else:
-            db_path = os.path.join(self.db_dir, self.db_name)
+        db_path = self.db_path()
         
         # Check if database exists
         db_exists = os.path.exists(db_path)
@@ -68,4 +78,105 @@ class DuckClient:
         if self.conn is not None:
             self.conn.close()
             self.conn = None
-            print("Connection closed")
\ No newline at end of file
+            print("Connection closed")
+    
+    def checkpoint(self):
+        """Flush the WAL into the database file, e.g. after a bulk load."""
+        if self.conn is None:
+            self.connect()
+        self.conn.execute("CHECKPOINT")
+    
+    def storage_metrics(self):
+        """
+        Collect file size and block usage for the database.
+        
+        Returns:
+            dict: file_size and wal_size in bytes, total/used/free block
+                  counts and the free block ratio
+        """
+        if self.conn is None:
+            self.connect()
+        
+        cursor = self.conn.execute("PRAGMA database_size")
+        columns = [desc[0] for desc in cursor.description]
+        row = dict(zip(columns, cursor.fetchone()))
+        
+        db_path = self.db_path()
+        wal_path = f"{db_path}.wal"
+        total_blocks = row.get('total_blocks') or 0
+        free_blocks = row.get('free_blocks') or 0
+        return {
+            'file_size': os.path.getsize(db_path) if os.path.exists(db_path) else 0,
+            'wal_size': os.path.getsize(wal_path) if os.path.exists(wal_path) else 0,
+            'total_blocks': total_blocks,
+            'used_blocks': row.get('used_blocks') or 0,
+            'free_blocks': free_blocks,
+            'free_block_ratio': free_blocks / total_blocks if total_blocks else 0.0,
+        }
+    
+    def compact(self):
+        """
+        Rewrite the database into a fresh file, dropping free blocks,
+        and reconnect to it.
+        """
+        if self.conn is None:
+            self.connect()
+        
+        db_path = self.db_path()
+        tmp_path = f"{db_path}.compact"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        
+        source = self.conn.execute("SELECT current_database()").fetchone()[0]
+        self.conn.execute("CHECKPOINT")
+        escaped_path = tmp_path.replace("'", "''")
+        self.conn.execute(f"ATTACH '{escaped_path}' AS compact_target")
+        self.conn.execute(f'COPY FROM DATABASE "{source}" TO compact_target')
+        self.conn.execute("DETACH compact_target")
+        self.close()
+        
+        # Swap the compacted file in place of the original
+        os.replace(tmp_path, db_path)
+        if os.path.exists(f"{db_path}.wal"):
+            os.remove(f"{db_path}.wal")
+        self.connect()
+    
+    def maintain(self, free_block_ratio=0.3, interval_minutes=0):
+        """
+        Checkpoint the database and compact it when too many blocks are free.
+        
+        Args:
+            free_block_ratio (float): Compact when free_blocks / total_blocks
+                                      exceeds this ratio
+            interval_minutes (float): Minimum time between compactions
+            
+        Returns:
+            tuple: (metrics before, metrics after, whether it was compacted)
+        """
+        state_path = f"{self.db_path()}.maintenance.json"
+        state = {}
+        if os.path.exists(state_path):
+            with open(state_path, 'r') as file:
+                state = json.load(file)
+        
+        before = self.storage_metrics()
+        self.checkpoint()
+        
+        # Block counts only cover data already written out of the WAL,
+        # so decide on the metrics taken after the checkpoint
+        checkpointed = self.storage_metrics()
+        
+        compacted = False
+        due = time.time() - state.get('last_compaction', 0) >= interval_minutes * 60
+        if checkpointed['free_block_ratio'] > free_block_ratio and due:
+            self.compact()
+            state['last_compaction'] = time.time()
+            compacted = True
+        
+        after = self.storage_metrics()
+        state['last_maintenance'] = time.time()
+        state['metrics'] = after
+        with open(state_path, 'w') as file:
+            json.dump(state, file, indent=2)
+        
+        return before, after, compacted
@@ -0,0 +1,234 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+
+REMOTE_SCHEMES = ('s3', 'gs', 'az')
+
+
+def is_remote_path(path):
+    """
+    Check whether a path is a remote object storage URI.
+
+    Args:
+        path (str): Path or URI from the execute setting
+
+    Returns:
+        bool: True for s3://, gs:// and az:// URIs
+    """
+    return bool(path) and urlparse(path).scheme in REMOTE_SCHEMES
+
+
+class RemoteCache:
+    def __init__(self, cache_dir="cache", max_size_mb=1024, credentials=None,
+                 range_threshold_mb=64, range_size_mb=16, max_workers=8):
+        """
+        Initialize a read-through cache for remote input files.
+
+        Args:
+            cache_dir (str): Local directory holding cached files
+            max_size_mb (int): Size cap for the cache, least recently used
+                               files are evicted above it
+            credentials (dict): Optional credentials
+                                - 'aws_access_key' / 'aws_secret_key' /
+                                  'aws_session_token' / 'endpoint_url' for S3
+                                - 'gcs_credentials' path to a service account JSON file
+                                - 'azure_connection_string' for Azure
+            range_threshold_mb (int): Parquet files at least this large are
+                                      downloaded with parallel ranged reads
+            range_size_mb (int): Size of each ranged read
+            max_workers (int): Number of parallel ranged reads
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.credentials = credentials or {}
+        self.range_threshold = int(range_threshold_mb * 1024 * 1024)
+        self.range_size = int(range_size_mb * 1024 * 1024)
+        self.max_workers = max_workers
+        self.index_path = os.path.join(self.cache_dir, "index.json")
+        self._clients = {}
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _load_index(self):
+        """Load the cache index, mapping URIs to cached file metadata."""
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path, 'r') as file:
+                return json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Ignoring unreadable cache index {self.index_path}. Error: {e}")
+            return {}
+
+    def _save_index(self, index):
+        """Atomically write the cache index."""
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump(index, file, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def _client(self, scheme):
+        """Create (once) the storage client for a URI scheme."""
+        if scheme in self._clients:
+            return self._clients[scheme]
+
+        if scheme == 's3':
+            import boto3
+            client = boto3.client(
+                's3',
+                aws_access_key_id=self.credentials.get('aws_access_key') or None,
+                aws_secret_access_key=self.credentials.get('aws_secret_key') or None,
+                aws_session_token=self.credentials.get('aws_session_token'),
+                endpoint_url=self.credentials.get('endpoint_url') or os.environ.get('S3_ENDPOINT_URL')
+            )
+        elif scheme == 'gs':
+            from google.cloud import storage
+            if self.credentials.get('gcs_credentials'):
+                client = storage.Client.from_service_account_json(self.credentials['gcs_credentials'])
+            else:
+                client = storage.Client()
+        elif scheme == 'az':
+            from azure.storage.blob import BlobServiceClient
+            connection_string = (self.credentials.get('azure_connection_string')
+                                 or os.environ.get('AZURE_STORAGE_CONNECTION_STRING'))
+            if not connection_string:
+                raise ValueError("Azure requires a connection string as credentials.")
+            client = BlobServiceClient.from_connection_string(connection_string)
+        else:
+            raise ValueError("Unsupported remote scheme. Use 's3://', 'gs://', or 'az://'.")
+
+        self._clients[scheme] = client
+        return client
+
+    def stat(self, uri):
+        """
+        Fetch the version and size of a remote object without downloading it.
+
+        Args:
+            uri (str): Remote URI
+
+        Returns:
+            tuple: (version, size) where version is the ETag (S3, Azure)
+                   or generation (GCS)
+        """
+        parsed = urlparse(uri)
+        bucket, key = parsed.netloc, parsed.path.lstrip('/')
+        client = self._client(parsed.scheme)
+
+        if parsed.scheme == 's3':
+            head = client.head_object(Bucket=bucket, Key=key)
+            return head['ETag'].strip('"'), head['ContentLength']
+        elif parsed.scheme == 'gs':
+            blob = client.bucket(bucket).get_blob(key)
+            if blob is None:
+                raise FileNotFoundError(uri)
+            return str(blob.generation), blob.size
+        else:
+            # Keep the ETag as returned, it is sent back in If-Match on reads
+            props = client.get_blob_client(container=bucket, blob=key).get_blob_properties()
+            return props.etag, props.size
+
+    def _read_range(self, uri, version, start, end):
+        """Read bytes [start, end] (inclusive) of a remote object."""
+        parsed = urlparse(uri)
+        bucket, key = parsed.netloc, parsed.path.lstrip('/')
+        client = self._client(parsed.scheme)
+
+        if parsed.scheme == 's3':
+            response = client.get_object(
+                Bucket=bucket, Key=key, Range=f"bytes={start}-{end}", IfMatch=f'"{version}"'
+            )
+            return response['Body'].read()
+        elif parsed.scheme == 'gs':
+            blob = client.bucket(bucket).blob(key, generation=int(version))
+            return blob.download_as_bytes(start=start, end=end)
+        else:
+            from azure.core import MatchConditions
+            blob_client = client.get_blob_client(container=bucket, blob=key)
+            return blob_client.download_blob(
+                offset=start, length=end - start + 1,
+                etag=version, match_condition=MatchConditions.IfNotModified
+            ).readall()
+
+    def _download(self, uri, version, size, local_path):
+        """Download a remote object to local_path, in parallel ranges when large."""
+        tmp_path = f"{local_path}.{os.getpid()}.part"
+
+        if size >= self.range_threshold and uri.lower().endswith('.parquet'):
+            ranges = [(start, min(start + self.range_size, size) - 1)
+                      for start in range(0, size, self.range_size)]
+
+            # Preallocate the file so every range can be written at its offset
+            with open(tmp_path, 'wb') as file:
+                file.truncate(size)
+
+            def fetch(byte_range):
+                start, end = byte_range
+                data = self._read_range(uri, version, start, end)
+                with open(tmp_path, 'r+b') as file:
+                    file.seek(start)
+                    file.write(data)
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                list(executor.map(fetch, ranges))
+            print(f"Downloaded {uri} in {len(ranges)} parallel ranges")
+        else:
+            data = self._read_range(uri, version, 0, size - 1) if size else b""
+            with open(tmp_path, 'wb') as file:
+                file.write(data)
+            print(f"Downloaded {uri}")
+
+        os.replace(tmp_path, local_path)
+
+    def _evict(self, index, keep):
+        """Evict least recently used files until the cache fits its size cap."""
+        total = sum(entry['size'] for entry in index.values())
+        for uri, entry in sorted(index.items(), key=lambda item: item[1]['last_access']):
+            if total <= self.max_bytes:
+                break
+            if uri == keep:
+                continue
+            try:
+                os.remove(entry['path'])
+            except FileNotFoundError:
+                pass
+            total -= entry['size']
+            del index[uri]
+            print(f"Evicted {uri} from cache")
+
+    def fetch(self, uri):
+        """
+        Return a local path for a remote URI, downloading only when the
+        remote object changed since it was cached.
+
+        Args:
+            uri (str): Remote URI
+
+        Returns:
+            str: Path of the cached local copy
+        """
+        version, size = self.stat(uri)
+        index = self._load_index()
+        entry = index.get(uri)
+
+        if entry and entry['version'] == version and os.path.exists(entry['path']):
+            print(f"Cache hit for {uri} (version {version})")
+        else:
+            # Name files by a hash of the URI, keeping the original extension
+            # so readers can detect the file type
+            ext = os.path.splitext(urlparse(uri).path)[1]
+            name = hashlib.sha256(uri.encode()).hexdigest()
+            local_path = os.path.join(self.cache_dir, name + ext)
+
+            self._download(uri, version, size, local_path)
+            entry = {'path': local_path, 'version': version, 'size': size}
+
+        entry['last_access'] = time.time()
+        index[uri] = entry
+        self._evict(index, keep=uri)
+        self._save_index(index)
+        return entry['path']
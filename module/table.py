@@ -1,31 +1,98 @@
 from duck_client import DuckClient
+from table_stats import TableStats
+import time
+
+# Table recording how far each source file has been ingested
+CHECKPOINT_TABLE = "_ingest_checkpoints"
+
+# Key carrying a processed row's position in its source file
+SOURCE_ROW = "_source_row"
+
 class Table:
-    def __init__(self, name, schema=[], primary_key=None, error_behavior='skip'):
+    def __init__(self, name, schema=[], primary_key=None, error_behavior='skip', indexes=None, cluster_by=None, stats_store=None, batch_size=10000):
         """
         Initialize a Table object.
         
         Args:
             name (str): Name of the table
             schema (list): List of tuples (column_name, data_type)
-            primary_key (str): Column name to use as primary key
+            primary_key (str or list): Column name, or list of column names
+                                       for a composite primary key
             error_behavior (str): How to handle type errors during insert
                                  'skip': Skip the row
                                  'null': Set value to NULL
                                  'error': Raise exception
                                  'convert': Try to convert to the right type
+            indexes (list): Secondary indexes, each a dictionary with
+                            'columns' (str or list) and optional 'name'
+                            and 'unique' keys
+            cluster_by (str or list): Column(s) to order rows by on load
+            stats_store (StatsStore): Optional store whose statistics for
+                                      this table are updated in the same
+                                      transaction as every loaded batch
+            batch_size (int): Number of source rows committed per transaction
         """
         self.name = name
         self.schema = schema
-        self.primary_key = primary_key
         self.error_behavior = error_behavior
+        self.stats_store = stats_store
+        self.stats = stats_store.table(name) if stats_store is not None else None
+        self.batch_size = batch_size
+        
+        column_names = [col[0] for col in self.schema]
+        
+        # Normalize the primary key to a list of columns
+        if not primary_key:
+            self.primary_key = []
+        elif isinstance(primary_key, str):
+            self.primary_key = [primary_key]
+        else:
+            self.primary_key = list(primary_key)
         
         # Validate inputs
-        if self.primary_key and self.primary_key not in [col[0] for col in self.schema]:
-            raise ValueError(f"Primary key '{primary_key}' must be a column in the schema")
+        for col_name in self.primary_key:
+            if col_name not in column_names:
+                raise ValueError(f"Primary key '{col_name}' must be a column in the schema")
         
         if self.error_behavior not in ['skip', 'null', 'error', 'convert']:
             raise ValueError("error_behavior must be 'skip', 'null', 'error', or 'convert'")
         
+        if self.batch_size < 1:
+            raise ValueError("batch_size must be a positive integer")
+        
+        # Normalize index definitions
+        self.indexes = []
+        for index in indexes or []:
+            if isinstance(index, (str, list)):
+                index = {'columns': index}
+            columns = index.get('columns')
+            if isinstance(columns, str):
+                columns = [columns]
+            if not columns:
+                raise ValueError(f"Index on table '{self.name}' must define at least one column")
+            for col_name in columns:
+                if col_name not in column_names:
+                    raise ValueError(f"Index column '{col_name}' must be a column in the schema")
+            self.indexes.append({
+                'name': index.get('name') or f"idx_{self.name}_{'_'.join(columns)}",
+                'columns': columns,
+                'unique': bool(index.get('unique', False)),
+            })
+        
+        # Normalize the clustering key to a list of columns
+        if not cluster_by:
+            self.cluster_by = []
+        elif isinstance(cluster_by, str):
+            self.cluster_by = [cluster_by]
+        else:
+            self.cluster_by = list(cluster_by)
+        for col_name in self.cluster_by:
+            if col_name not in column_names:
+                raise ValueError(f"Cluster column '{col_name}' must be a column in the schema")
+        
+        # Seconds spent building indexes during the last call to create
+        self.index_build_time = 0.0
+        
         # Create a dictionary for quick type checking
         self.column_types = {col_name: data_type for col_name, data_type in self.schema}
         
@@ -39,10 +106,12 @@ class Table:
         # Generate column definitions
         col_defs = []
         for col_name, data_type in self.schema:
-            if col_name == self.primary_key:
-                col_defs.append(f'"{col_name}" {data_type} PRIMARY KEY')
-            else:
-                col_defs.append(f'"{col_name}" {data_type}')
+            col_defs.append(f'"{col_name}" {data_type}')
+        
+        # Add the (possibly composite) primary key as a table constraint
+        if self.primary_key:
+            key_cols = ", ".join(f'"{col_name}"' for col_name in self.primary_key)
+            col_defs.append(f'PRIMARY KEY ({key_cols})')
         
         # Join column definitions
         columns_sql = ",\n    ".join(col_defs)
@@ -52,6 +121,65 @@ class Table:
         
         return sql
     
+    def index_sql(self):
+        """
+        Generate SQL statements to create this table's secondary indexes.
+        
+        Returns:
+            list: (index_name, SQL CREATE INDEX statement) tuples
+        """
+        statements = []
+        for index in self.indexes:
+            unique = "UNIQUE " if index['unique'] else ""
+            index_cols = ", ".join(f'"{col_name}"' for col_name in index['columns'])
+            sql = f'CREATE {unique}INDEX IF NOT EXISTS "{index["name"]}" ON "{self.name}" ({index_cols})'
+            statements.append((index['name'], sql))
+        return statements
+    
+    def cluster_sql(self):
+        """
+        Generate the ORDER BY clause used to cluster rows on load.
+        
+        Returns:
+            str: ORDER BY clause, or an empty string if no clustering key is set
+        """
+        if not self.cluster_by:
+            return ""
+        cluster_cols = ", ".join(f'"{col_name}"' for col_name in self.cluster_by)
+        return f"ORDER BY {cluster_cols}"
+    
+    def cluster_rows(self, rows):
+        """
+        Sort rows by the clustering key so DuckDB zone maps stay selective.
+        
+        Args:
+            rows (list): List of dictionaries containing column-value pairs
+            
+        Returns:
+            list: Rows ordered by the clustering key (NULLs last)
+        """
+        if not self.cluster_by:
+            return rows
+        
+        def sort_key(row, as_text):
+            key = []
+            for col_name in self.cluster_by:
+                value = row.get(col_name)
+                if value is None:
+                    key.append((True, ""))
+                    continue
+                # Text columns are stored as VARCHAR, so order them as text
+                if as_text or self.column_types[col_name].upper().startswith(('VARCHAR', 'CHAR', 'TEXT')):
+                    value = str(value)
+                key.append((False, value))
+            return tuple(key)
+        
+        try:
+            return sorted(rows, key=lambda row: sort_key(row, False))
+        except TypeError:
+            # Mixed value types in a clustering column, fall back to text order
+            return sorted(rows, key=lambda row: sort_key(row, True))
+    
     def insert_sql(self, data_rows):
         """
         Generate SQL to insert rows into the table.
@@ -223,13 +351,180 @@ class Table:
             traceback.print_exc()
             return None, {}, 0, len(data_rows)
     
-    def insert(self, conn, data_rows):
+    def process_row(self, row):
         """
-        Insert data rows into the table using a simpler approach.
+        Validate and convert a single row according to the schema.
+        
+        Args:
+            row (dict): Column-value pairs
+            
+        Returns:
+            dict: Processed row
+            
+        Raises:
+            ValueError: If the row has to be skipped or error_behavior is 'error'
+        """
+        processed_row = {}
+        for col_name, data_type in self.schema:
+            if col_name not in row:
+                processed_row[col_name] = None
+                continue
+            
+            value = row[col_name]
+            if value is None:
+                processed_row[col_name] = None
+                continue
+            
+            # Basic type conversions
+            if data_type.upper().startswith('INT') and not isinstance(value, int):
+                if self.error_behavior == 'convert':
+                    processed_row[col_name] = int(float(value))
+                elif self.error_behavior == 'null':
+                    processed_row[col_name] = None
+                elif self.error_behavior == 'error':
+                    raise ValueError(f"Type mismatch for {col_name}")
+                else:  # skip
+                    raise ValueError(f"Skipping row due to type mismatch for {col_name}")
+            elif data_type.upper().startswith(('FLOAT', 'DOUBLE', 'DECIMAL')) and not isinstance(value, (int, float)):
+                if self.error_behavior == 'convert':
+                    processed_row[col_name] = float(value)
+                elif self.error_behavior == 'null':
+                    processed_row[col_name] = None
+                elif self.error_behavior == 'error':
+                    raise ValueError(f"Type mismatch for {col_name}")
+                else:  # skip
+                    raise ValueError(f"Skipping row due to type mismatch for {col_name}")
+            elif data_type.upper().startswith(('BOOL', 'BOOLEAN')) and not isinstance(value, bool):
+                if self.error_behavior == 'convert':
+                    if isinstance(value, str):
+                        processed_row[col_name] = value.lower() in ('true', 't', 'yes', 'y', '1')
+                    else:
+                        processed_row[col_name] = bool(value)
+                elif self.error_behavior == 'null':
+                    processed_row[col_name] = None
+                elif self.error_behavior == 'error':
+                    raise ValueError(f"Type mismatch for {col_name}")
+                else:  # skip
+                    raise ValueError(f"Skipping row due to type mismatch for {col_name}")
+            else:
+                processed_row[col_name] = value
+        
+        return processed_row
+    
+    def ensure_checkpoint_table(self, conn):
+        """
+        Create the table holding ingestion checkpoints if it does not exist.
+        
+        Args:
+            conn: Database connection
+        """
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS "{CHECKPOINT_TABLE}" (
+                "table_name" VARCHAR,
+                "source_id" VARCHAR,
+                "row_offset" BIGINT,
+                "row_count" BIGINT,
+                "updated_at" TIMESTAMP,
+                PRIMARY KEY ("table_name", "source_id")
+            )
+        """)
+    
+    def get_checkpoint(self, conn, source_id):
+        """
+        Look up how many source rows were already committed.
+        
+        Args:
+            conn: Database connection
+            source_id (str): Identity of the source file
+            
+        Returns:
+            int: Number of source rows already consumed
+        """
+        rows = conn.execute(
+            f'SELECT "row_offset" FROM "{CHECKPOINT_TABLE}" WHERE "table_name" = ? AND "source_id" = ?',
+            [self.name, source_id]
+        ).fetchall()
+        return rows[0][0] if rows else 0
+    
+    def completed_sources(self, conn):
+        """
+        List the sources whose rows were all ingested into this table.
+        
+        Args:
+            conn: Database connection
+            
+        Returns:
+            set: Identities of the fully ingested source files
+        """
+        exists = conn.execute(
+            "SELECT COUNT(*) FROM duckdb_tables() WHERE table_name = ?", [CHECKPOINT_TABLE]
+        ).fetchone()[0]
+        if not exists:
+            return set()
+        rows = conn.execute(
+            f'SELECT "source_id" FROM "{CHECKPOINT_TABLE}" WHERE "table_name" = ? AND "row_offset" >= "row_count"',
+            [self.name]
+        ).fetchall()
+        return {row[0] for row in rows}
+    
+    def _save_stats(self, new_stats):
+        """Write statistics as part of the caller's open transaction."""
+        if new_stats is not None:
+            self.stats_store.save(self.name, new_stats)
+    
+    def _apply_stats(self, new_stats):
+        """Adopt statistics once the transaction that stored them committed."""
+        if new_stats is not None:
+            self.stats.columns = new_stats.columns
+    
+    def _commit_rows(self, conn, rows, source_id, row_offset, row_count=None):
+        """
+        Insert rows and advance the checkpoint in a single transaction.
+        
+        Args:
+            conn: Database connection
+            rows (list): Processed rows to insert
+            source_id (str): Identity of the source file, or None
+            row_offset (int): Source rows consumed once this commit succeeds
+            row_count (int): Number of rows in the source file
+        """
+        columns = ', '.join(f'"{col_name}"' for col_name, _ in self.schema)
+        placeholders = ', '.join(['?' for _ in self.schema])
+        sql = f'INSERT INTO "{self.name}" ({columns}) VALUES ({placeholders})'
+        
+        new_stats = None
+        if self.stats is not None:
+            new_stats = self.stats.copy()
+            new_stats.update({k: v for k, v in row.items() if k != SOURCE_ROW} for row in rows)
+        
+        conn.execute("BEGIN TRANSACTION")
+        try:
+            if rows:
+                conn.executemany(sql, [[row.get(col_name) for col_name, _ in self.schema] for row in rows])
+            if source_id is not None:
+                conn.execute(
+                    f'INSERT OR REPLACE INTO "{CHECKPOINT_TABLE}" VALUES (?, ?, ?, ?, current_timestamp)',
+                    [self.name, source_id, row_offset, row_count]
+                )
+            self._save_stats(new_stats)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._apply_stats(new_stats)
+    
+    def insert(self, conn, data_rows, source_id=None):
+        """
+        Insert data rows into the table in transactional batches.
+        
+        When a source_id is given, the number of consumed source rows is
+        recorded in the same transaction as each batch, so a restarted run
+        resumes after the last committed batch instead of starting over.
         
         Args:
             conn: Database connection
             data_rows (list): List of dictionaries containing column-value pairs
+            source_id (str): Optional identity of the source file
             
         Returns:
             tuple: (success_count, error_count)
@@ -237,98 +532,278 @@ class Table:
         if not data_rows:
             return 0, 0
         
-        # Process rows according to schema and error_behavior
-        valid_rows = []
-        for row in data_rows:
-            try:
-                processed_row = {}
-                for col_name, data_type in self.schema:
-                    if col_name not in row:
-                        processed_row[col_name] = None
-                        continue
-                    
-                    value = row[col_name]
-                    if value is None:
-                        processed_row[col_name] = None
-                        continue
-                    
-                    # Basic type conversions
-                    if data_type.upper().startswith('INT') and not isinstance(value, int):
-                        if self.error_behavior == 'convert':
-                            processed_row[col_name] = int(float(value))
-                        elif self.error_behavior == 'null':
-                            processed_row[col_name] = None
-                        elif self.error_behavior == 'error':
-                            raise ValueError(f"Type mismatch for {col_name}")
-                        else:  # skip
-                            raise ValueError(f"Skipping row due to type mismatch for {col_name}")
-                    elif data_type.upper().startswith(('FLOAT', 'DOUBLE', 'DECIMAL')) and not isinstance(value, (int, float)):
-                        if self.error_behavior == 'convert':
-                            processed_row[col_name] = float(value)
-                        elif self.error_behavior == 'null':
-                            processed_row[col_name] = None
-                        elif self.error_behavior == 'error':
-                            raise ValueError(f"Type mismatch for {col_name}")
-                        else:  # skip
-                            raise ValueError(f"Skipping row due to type mismatch for {col_name}")
-                    elif data_type.upper().startswith(('BOOL', 'BOOLEAN')) and not isinstance(value, bool):
-                        if self.error_behavior == 'convert':
-                            if isinstance(value, str):
-                                processed_row[col_name] = value.lower() in ('true', 't', 'yes', 'y', '1')
-                            else:
-                                processed_row[col_name] = bool(value)
-                        elif self.error_behavior == 'null':
-                            processed_row[col_name] = None
-                        elif self.error_behavior == 'error':
-                            raise ValueError(f"Type mismatch for {col_name}")
-                        else:  # skip
-                            raise ValueError(f"Skipping row due to type mismatch for {col_name}")
-                    else:
-                        processed_row[col_name] = value
-                
+        start_offset = 0
+        if source_id is not None:
+            self.ensure_checkpoint_table(conn)
+            start_offset = self.get_checkpoint(conn, source_id)
+            if start_offset >= len(data_rows):
+                print(f"Source {source_id} already ingested into {self.name}, skipping")
+                return 0, 0
+            if start_offset:
+                print(f"Resuming ingestion of {source_id} at row {start_offset}")
+        
+        success_count = 0
+        for batch_start in range(start_offset, len(data_rows), self.batch_size):
+            batch = data_rows[batch_start:batch_start + self.batch_size]
+            batch_end = batch_start + len(batch)
+            
+            # Process rows according to schema and error_behavior,
+            # remembering each row's position in the source
+            valid_rows = []
+            for source_row, row in enumerate(batch, start=batch_start):
+                try:
+                    processed_row = self.process_row(row)
+                except Exception as e:
+                    if self.error_behavior == 'error':
+                        raise
+                    print(f"Skipping row due to error: {e}")
+                    continue
+                processed_row[SOURCE_ROW] = source_row
                 valid_rows.append(processed_row)
+            
+            # Apply the clustering key so the batch lands in sorted order
+            valid_rows = self.cluster_rows(valid_rows)
+            
+            try:
+                self._commit_rows(conn, valid_rows, source_id, batch_end, len(data_rows))
+                inserted_rows = valid_rows
+            except Exception as e:
+                print(f"Error inserting batch at row {batch_start}, retrying row by row: {e}")
                 
+                # Commit rows one at a time in source order so a single bad row
+                # does not fail the batch. Every source row before the committed
+                # one has then been handled, so the checkpoint stays a prefix.
+                inserted_rows = []
+                for row in sorted(valid_rows, key=lambda row: row[SOURCE_ROW]):
+                    try:
+                        self._commit_rows(conn, [row], source_id, row[SOURCE_ROW] + 1, len(data_rows))
+                        inserted_rows.append(row)
+                    except Exception as e:
+                        print(f"Error inserting row: {e}")
+                if source_id is not None:
+                    self._commit_rows(conn, [], source_id, batch_end, len(data_rows))
+            
+            success_count += len(inserted_rows)
+        
+        return success_count, len(data_rows) - start_offset - success_count
+    
+    def _read_shard(self, conn, shard_path, start_offset):
+        """
+        Read the rows of a Parquet shard past a source offset. Values are
+        cast to the schema when each row is inserted, so a value that does
+        not cast only fails its own row.
+        
+        Args:
+            conn: Database connection
+            shard_path (str): Parquet file written by a worker
+            start_offset (int): First source row to read
+            
+        Returns:
+            list: Row dictionaries including their source row, in source order
+        """
+        escaped_path = shard_path.replace("'", "''")
+        columns = ', '.join(f'"{col_name}"' for col_name, _ in self.schema)
+        cursor = conn.execute(
+            f'SELECT {columns}, "{SOURCE_ROW}" '
+            f"FROM read_parquet('{escaped_path}') "
+            f'WHERE "{SOURCE_ROW}" >= ? ORDER BY "{SOURCE_ROW}"',
+            [start_offset]
+        )
+        columns = [desc[0] for desc in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    
+    def load_shard(self, conn, shard_path, source_id, row_count, shard_stats=None):
+        """
+        Bulk load a Parquet shard written by a worker, together with its
+        ingestion checkpoint in a single transaction. If the bulk load fails,
+        e.g. on a duplicate key, the rows are committed one at a time instead.
+        
+        Args:
+            conn: Database connection
+            shard_path (str): Parquet file of processed rows with a
+                              "_source_row" column, or None if the source
+                              had no valid rows
+            source_id (str): Identity of the source file
+            row_count (int): Number of rows in the source file
+            shard_stats (TableStats): Statistics of all the shard's rows
+            
+        Returns:
+            int: Number of rows inserted, 0 if the source was already ingested
+        """
+        self.ensure_checkpoint_table(conn)
+        start_offset = self.get_checkpoint(conn, source_id)
+        if row_count and start_offset >= row_count:
+            print(f"Source {source_id} already ingested into {self.name}, skipping")
+            return 0
+        
+        new_stats = None
+        if self.stats is not None:
+            # After a partial checkpoint only part of the shard is loaded
+            if start_offset and shard_path:
+                shard_stats = TableStats()
+                shard_stats.update(
+                    {k: v for k, v in row.items() if k != SOURCE_ROW}
+                    for row in self._read_shard(conn, shard_path, start_offset)
+                )
+            new_stats = self.stats.copy()
+            if shard_stats is not None:
+                new_stats.merge(shard_stats)
+        
+        columns = ', '.join(f'"{col_name}"' for col_name, _ in self.schema)
+        casts = ', '.join(f'CAST("{col_name}" AS {data_type})' for col_name, data_type in self.schema)
+        
+        conn.execute("BEGIN TRANSACTION")
+        try:
+            inserted = 0
+            if shard_path:
+                # Only rows past an earlier partial checkpoint are loaded
+                escaped_path = shard_path.replace("'", "''")
+                inserted = conn.execute(
+                    f'INSERT INTO "{self.name}" ({columns}) '
+                    f"SELECT {casts} FROM read_parquet('{escaped_path}') "
+                    f'WHERE "{SOURCE_ROW}" >= ? {self.cluster_sql()}',
+                    [start_offset]
+                ).fetchone()[0]
+            conn.execute(
+                f'INSERT OR REPLACE INTO "{CHECKPOINT_TABLE}" VALUES (?, ?, ?, ?, current_timestamp)',
+                [self.name, source_id, row_count, row_count]
+            )
+            self._save_stats(new_stats)
+            conn.execute("COMMIT")
+        except Exception as e:
+            conn.execute("ROLLBACK")
+            print(f"Error loading shard {shard_path}, retrying row by row: {e}")
+            return self._load_shard_rows(conn, shard_path, source_id, row_count, start_offset)
+        self._apply_stats(new_stats)
+        return inserted
+    
+    def _load_shard_rows(self, conn, shard_path, source_id, row_count, start_offset):
+        """
+        Commit a shard's rows one at a time in source order, advancing the
+        checkpoint and statistics with each row.
+        
+        Returns:
+            int: Number of rows inserted
+        """
+        inserted = 0
+        for row in self._read_shard(conn, shard_path, start_offset):
+            try:
+                self._commit_rows(conn, [row], source_id, row[SOURCE_ROW] + 1, row_count)
+                inserted += 1
             except Exception as e:
-                if self.error_behavior == 'error':
-                    raise
-                print(f"Skipping row due to error: {e}")
+                print(f"Error inserting row: {e}")
+        self._commit_rows(conn, [], source_id, row_count, row_count)
+        return inserted
+    
+    def replace_with_query(self, conn, sql_string):
+        """
+        Replace the table contents with the result of a query, keeping the
+        declared primary key and indexes.
         
-        if not valid_rows:
-            return 0, len(data_rows)
+        The query runs into a staging table first, so it may read from this
+        table, then the rows are swapped in clustered order in one transaction.
         
+        Args:
+            conn: Database connection
+            sql_string (str): SELECT statement returning only columns of the
+                              schema, matched to them by name
+            
+        Returns:
+            int: Number of rows in the table
+        """
+        staging = f"{self.name}__staging"
+        conn.execute("BEGIN TRANSACTION")
         try:
-            # Insert each valid row separately for better error handling
-            success_count = 0
-            for row in valid_rows:
-                try:
-                    # Build column and value lists
-                    columns = []
-                    values = []
-                    for col_name, _ in self.schema:
-                        columns.append(f'"{col_name}"')
-                        values.append(row.get(col_name))
-                    
-                    # Create SQL
-                    cols_str = ', '.join(columns)
-                    placeholders = ', '.join(['?' for _ in values])
-                    sql = f'INSERT INTO "{self.name}" ({cols_str}) VALUES ({placeholders})'
-                    
-                    # Execute
-                    conn.execute(sql, values)
-                    success_count += 1
-                    
-                except Exception as e:
-                    print(f"Error inserting row: {e}")
+            conn.execute(f'CREATE OR REPLACE TEMP TABLE "{staging}" AS {sql_string}')
+            conn.execute(f'DELETE FROM "{self.name}"')
+            count = conn.execute(
+                f'INSERT INTO "{self.name}" BY NAME SELECT * FROM "{staging}" {self.cluster_sql()}'
+            ).fetchone()[0]
+            conn.execute(f'DROP TABLE "{staging}"')
             
-            return success_count, len(data_rows) - success_count
+            # The contents were replaced, so rebuild the statistics from them
+            new_stats = self.compute_stats(conn) if self.stats is not None else None
+            self._save_stats(new_stats)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._apply_stats(new_stats)
+        return count
+    
+    def compute_stats(self, conn):
+        """
+        Compute statistics from the table contents inside DuckDB.
+        Used after the table has been replaced by a SQL materialization.
         
-        except Exception as e:
-            print(f"Error in insert: {e}")
-            return 0, len(data_rows)
+        Args:
+            conn: Database connection
+            
+        Returns:
+            TableStats: Statistics of the current table contents
+        """
+        return TableStats.from_table(conn, self.name, self.schema)
+    
+    def existing_indexes(self, conn):
+        """
+        List the indexes that already exist on this table.
+        
+        Args:
+            conn: Database connection
+            
+        Returns:
+            set: Names of existing indexes
+        """
+        rows = conn.execute(
+            "SELECT index_name FROM duckdb_indexes() WHERE table_name = ?",
+            [self.name]
+        ).fetchall()
+        return {row[0] for row in rows}
+    
+    def existing_primary_key(self, conn):
+        """
+        Look up the primary key columns of the existing table.
+        
+        Args:
+            conn: Database connection
+            
+        Returns:
+            list: Primary key column names, empty if there is none
+        """
+        rows = conn.execute(
+            "SELECT constraint_column_names FROM duckdb_constraints() "
+            "WHERE table_name = ? AND constraint_type = 'PRIMARY KEY'",
+            [self.name]
+        ).fetchall()
+        return list(rows[0][0]) if rows else []
+    
+    def create_indexes(self, conn):
+        """
+        Create any secondary indexes that do not exist yet.
+        
+        Args:
+            conn: Database connection
+            
+        Returns:
+            list: Names of the indexes that were created
+        """
+        existing = self.existing_indexes(conn)
+        created = []
+        start = time.time()
+        for index_name, sql in self.index_sql():
+            if index_name in existing:
+                continue
+            conn.execute(sql)
+            created.append(index_name)
+        self.index_build_time = time.time() - start
+        if created:
+            print(f"Built indexes {', '.join(created)} on {self.name} in {self.index_build_time:.3f}s")
+        return created
     
     def create(self, conn):
         """
-        Create the table in the database.
+        Create the table in the database, or reconcile an existing table
+        with the primary key and indexes declared for it.
         
         Args:
             conn: Database connection
@@ -338,6 +813,14 @@ class Table:
         """
         try:
             conn.execute(self.create_sql())
+            
+            # DuckDB cannot alter a primary key in place, so only report drift
+            existing_key = self.existing_primary_key(conn)
+            if existing_key != self.primary_key:
+                print(f"Warning: Table {self.name} has primary key {existing_key}, "
+                      f"table.yaml declares {self.primary_key}. Recreate the table to apply it.")
+            
+            self.create_indexes(conn)
             return True
         except Exception as e:
             print(f"Error creating table: {e}")
@@ -0,0 +1,471 @@
+import base64
+import datetime
+import decimal
+import hashlib
+import json
+import math
+
+
+# Type prefixes of the columns summarized with quantiles
+NUMERIC_TYPES = ('TINYINT', 'SMALLINT', 'INT', 'BIGINT', 'HUGEINT', 'UTINYINT', 'USMALLINT',
+                 'UINTEGER', 'UBIGINT', 'UHUGEINT', 'FLOAT', 'REAL', 'DOUBLE', 'DECIMAL', 'NUMERIC')
+
+
+def _hash_key(value):
+    """
+    Text form of a value hashed into HyperLogLog sketches. It matches the
+    VARCHAR cast used by TableStats.from_table, numbers being hashed as
+    DOUBLE, so sketches built in Python and in DuckDB can be merged.
+    """
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float, decimal.Decimal)):
+        return repr(float(value))
+    return str(value)
+
+
+class HyperLogLog:
+    def __init__(self, precision=12, registers=None):
+        """
+        Initialize a HyperLogLog sketch for approximate distinct counts.
+
+        Args:
+            precision (int): Number of index bits, the sketch uses
+                             2**precision registers (~1.6% error at 12)
+            registers (bytearray): Optional existing registers
+        """
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = registers if registers is not None else bytearray(self.m)
+
+    def add(self, value):
+        """Add a value to the sketch."""
+        digest = hashlib.md5(_hash_key(value).encode()).digest()
+        h = int.from_bytes(digest[:8], 'little')
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        """Merge another sketch with the same precision into this one."""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def count(self):
+        """
+        Estimate the number of distinct values added.
+
+        Returns:
+            int: Approximate distinct count
+        """
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+
+        # Linear counting is more accurate for small cardinalities
+        if estimate <= 2.5 * self.m and zeros:
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+    def to_dict(self):
+        return {
+            'precision': self.precision,
+            'registers': base64.b64encode(bytes(self.registers)).decode(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['precision'], bytearray(base64.b64decode(data['registers'])))
+
+
+class TDigest:
+    def __init__(self, compression=100, centroids=None):
+        """
+        Initialize a merging t-digest for approximate quantiles.
+
+        Args:
+            compression (int): Higher values keep more centroids and
+                               give more accurate quantiles
+            centroids (list): Optional existing [mean, weight] pairs
+        """
+        self.compression = compression
+        self.centroids = centroids or []
+        self.buffer = []
+
+    def add(self, value):
+        """Add a numeric value to the digest."""
+        self.buffer.append(float(value))
+        if len(self.buffer) >= self.compression * 10:
+            self.compress()
+
+    def merge(self, other):
+        """Merge another digest into this one."""
+        other.compress()
+        self.compress()
+        self.centroids = self.centroids + other.centroids
+        self._merge_centroids()
+
+    def compress(self):
+        """Fold buffered values into the centroids."""
+        if not self.buffer:
+            return
+        self.centroids = self.centroids + [[value, 1] for value in self.buffer]
+        self.buffer = []
+        self._merge_centroids()
+
+    def _merge_centroids(self):
+        centroids = sorted(self.centroids)
+        total = sum(weight for _, weight in centroids)
+        if not centroids:
+            return
+
+        merged = []
+        cumulative = 0
+        mean, weight = centroids[0]
+        for next_mean, next_weight in centroids[1:]:
+            # Keep centroids small near the tails so extreme quantiles stay accurate
+            q = (cumulative + weight + next_weight / 2) / total
+            limit = max(4 * total * q * (1 - q) / self.compression, 1)
+            if weight + next_weight <= limit:
+                mean = (mean * weight + next_mean * next_weight) / (weight + next_weight)
+                weight += next_weight
+            else:
+                merged.append([mean, weight])
+                cumulative += weight
+                mean, weight = next_mean, next_weight
+        merged.append([mean, weight])
+        self.centroids = merged
+
+    def quantile(self, q):
+        """
+        Estimate a quantile.
+
+        Args:
+            q (float): Quantile between 0 and 1
+
+        Returns:
+            float: Approximate value at the quantile, None if empty
+        """
+        self.compress()
+        if not self.centroids:
+            return None
+        if len(self.centroids) == 1:
+            return self.centroids[0][0]
+
+        total = sum(weight for _, weight in self.centroids)
+        target = q * total
+        cumulative = 0
+        previous_center, previous_mean = None, None
+        for mean, weight in self.centroids:
+            center = cumulative + weight / 2
+            if target <= center:
+                if previous_center is None:
+                    return mean
+                fraction = (target - previous_center) / (center - previous_center)
+                return previous_mean + fraction * (mean - previous_mean)
+            previous_center, previous_mean = center, mean
+            cumulative += weight
+        return self.centroids[-1][0]
+
+    def to_dict(self):
+        self.compress()
+        return {'compression': self.compression, 'centroids': self.centroids}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['compression'], data['centroids'])
+
+
+def _comparable(value):
+    """Normalize a value so it can be compared and stored as JSON."""
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (datetime.date, datetime.datetime, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+class ColumnStats:
+    def __init__(self, data=None):
+        """
+        Initialize mergeable statistics for a single column.
+
+        Args:
+            data (dict): Optional serialized statistics from to_dict
+        """
+        data = data or {}
+        self.row_count = data.get('row_count', 0)
+        self.null_count = data.get('null_count', 0)
+        self.min = data.get('min')
+        self.max = data.get('max')
+        self.distinct = HyperLogLog.from_dict(data['distinct']) if 'distinct' in data else HyperLogLog()
+        self.quantiles = TDigest.from_dict(data['quantiles']) if 'quantiles' in data else TDigest()
+
+    def add(self, value):
+        """Add a single value to the column statistics."""
+        self.row_count += 1
+        if value is None:
+            self.null_count += 1
+            return
+
+        value = _comparable(value)
+        try:
+            if self.min is None or value < self.min:
+                self.min = value
+            if self.max is None or value > self.max:
+                self.max = value
+        except TypeError:
+            # Mixed types in one column, fall back to comparing as strings
+            self.min = min(str(self.min), str(value))
+            self.max = max(str(self.max), str(value))
+
+        self.distinct.add(value)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            self.quantiles.add(value)
+
+    def merge(self, other):
+        """Merge statistics computed on another batch of the same column."""
+        self.row_count += other.row_count
+        self.null_count += other.null_count
+        for value in (other.min, other.max):
+            if value is None:
+                continue
+            try:
+                if self.min is None or value < self.min:
+                    self.min = value
+                if self.max is None or value > self.max:
+                    self.max = value
+            except TypeError:
+                self.min = min(str(self.min), str(value))
+                self.max = max(str(self.max), str(value))
+        self.distinct.merge(other.distinct)
+        self.quantiles.merge(other.quantiles)
+
+    def summary(self):
+        """
+        Summarize the column statistics.
+
+        Returns:
+            dict: Row and null counts, min/max, approximate distinct count
+                  and approximate median / p95 for numeric columns
+        """
+        return {
+            'row_count': self.row_count,
+            'null_count': self.null_count,
+            'min': self.min,
+            'max': self.max,
+            'approx_distinct': self.distinct.count() if self.row_count > self.null_count else 0,
+            'p50': self.quantiles.quantile(0.5),
+            'p95': self.quantiles.quantile(0.95),
+        }
+
+    def to_dict(self):
+        return {
+            'row_count': self.row_count,
+            'null_count': self.null_count,
+            'min': self.min,
+            'max': self.max,
+            'distinct': self.distinct.to_dict(),
+            'quantiles': self.quantiles.to_dict(),
+        }
+
+
+class TableStats:
+    def __init__(self, data=None):
+        """
+        Initialize statistics for all columns of a table.
+
+        Args:
+            data (dict): Optional serialized statistics keyed by column name
+        """
+        self.columns = {col_name: ColumnStats(col_data) for col_name, col_data in (data or {}).items()}
+
+    @classmethod
+    def from_table(cls, conn, table_name, schema, precision=12, compression=100):
+        """
+        Compute statistics from the contents of a table inside DuckDB, so
+        the rows are never streamed through Python.
+
+        Counts, min and max come from a single aggregate. HyperLogLog
+        registers are the maximum rank per bucket of each value's hash, and
+        t-digest centroids are the means of sorted values grouped on the
+        digest's scale, small at the tails and large around the median.
+
+        Args:
+            conn: Database connection
+            table_name (str): Table to summarize
+            schema (list): [column name, data type] pairs
+            precision (int): HyperLogLog precision
+            compression (int): t-digest compression
+
+        Returns:
+            TableStats: Statistics of the table contents
+        """
+        stats = cls()
+        if not schema:
+            return stats
+
+        def quote(col_name):
+            return '"' + col_name.replace('"', '""') + '"'
+
+        numeric = [col_name for col_name, data_type in schema if data_type.upper().startswith(NUMERIC_TYPES)]
+
+        aggregates = ["COUNT(*)"]
+        for col_name, _ in schema:
+            aggregates += [f"COUNT({quote(col_name)})", f"MIN({quote(col_name)})", f"MAX({quote(col_name)})"]
+        row = conn.execute(f'SELECT {", ".join(aggregates)} FROM {quote(table_name)}').fetchone()
+        for i, (col_name, _) in enumerate(schema):
+            col_stats = ColumnStats()
+            col_stats.row_count = row[0]
+            col_stats.null_count = row[0] - row[1 + 3 * i]
+            col_stats.min = _comparable(row[2 + 3 * i]) if row[2 + 3 * i] is not None else None
+            col_stats.max = _comparable(row[3 + 3 * i]) if row[3 + 3 * i] is not None else None
+            col_stats.distinct = HyperLogLog(precision)
+            col_stats.quantiles = TDigest(compression)
+            stats.columns[col_name] = col_stats
+
+        # Same hash as HyperLogLog.add: md5_number is the little-endian MD5 digest
+        # of _hash_key, whose low 64 bits are its first 8 bytes
+        keys = ", ".join(
+            f"CAST(CAST({quote(col_name)} AS DOUBLE) AS VARCHAR) AS {quote(col_name)}" if col_name in numeric
+            else f"CAST({quote(col_name)} AS VARCHAR) AS {quote(col_name)}"
+            for col_name, _ in schema
+        )
+        rest_bits = 64 - precision
+        rows = conn.execute(f"""
+            SELECT column_name, h >> {rest_bits} AS bucket,
+                   -- Leading zeros of the remaining bits, plus one
+                   MAX(CASE WHEN rest = 0 THEN {rest_bits + 1}
+                            ELSE instr(CAST(rest AS BIT)::VARCHAR, '1') - {precision} END) AS rank
+            FROM (
+                SELECT column_name, h, h & {(1 << rest_bits) - 1}::UBIGINT AS rest
+                FROM (
+                    SELECT column_name, CAST(md5_number(hash_key) & {(1 << 64) - 1} AS UBIGINT) AS h
+                    FROM (UNPIVOT (SELECT {keys} FROM {quote(table_name)})
+                          ON COLUMNS(*) INTO NAME column_name VALUE hash_key)
+                )
+            )
+            GROUP BY column_name, bucket
+        """).fetchall()
+        for col_name, bucket, rank in rows:
+            stats.columns[col_name].distinct.registers[bucket] = rank
+
+        if numeric:
+            values = ", ".join(f"CAST({quote(col_name)} AS DOUBLE) AS {quote(col_name)}" for col_name in numeric)
+            rows = conn.execute(f"""
+                SELECT column_name, AVG(value) AS mean, COUNT(*) AS weight
+                FROM (
+                    SELECT column_name, value,
+                           (ROW_NUMBER() OVER (PARTITION BY column_name ORDER BY value) - 0.5)
+                               / COUNT(*) OVER (PARTITION BY column_name) AS q
+                    FROM (UNPIVOT (SELECT {values} FROM {quote(table_name)})
+                          ON COLUMNS(*) INTO NAME column_name VALUE value)
+                )
+                GROUP BY column_name, floor({compression / 4} * ln(q / (1 - q)))
+                ORDER BY column_name, mean
+            """).fetchall()
+            for col_name, mean, weight in rows:
+                stats.columns[col_name].quantiles.centroids.append([mean, weight])
+            for col_name in numeric:
+                stats.columns[col_name].quantiles._merge_centroids()
+        return stats
+
+    def update(self, rows):
+        """
+        Update the statistics from a batch of loaded rows.
+
+        Args:
+            rows (list): List of dictionaries containing column-value pairs
+        """
+        for row in rows:
+            for col_name, value in row.items():
+                if col_name not in self.columns:
+                    self.columns[col_name] = ColumnStats()
+                self.columns[col_name].add(value)
+
+    def merge(self, other):
+        """
+        Merge statistics computed on another batch of the same table,
+        e.g. by a worker process.
+
+        Args:
+            other (TableStats): Statistics to fold into these
+        """
+        for col_name, stats in other.columns.items():
+            if col_name not in self.columns:
+                self.columns[col_name] = ColumnStats()
+            self.columns[col_name].merge(stats)
+
+    def copy(self):
+        """
+        Returns:
+            TableStats: Independent copy of these statistics
+        """
+        return TableStats(self.to_dict())
+
+    def summary(self):
+        """
+        Returns:
+            dict: Column summaries keyed by column name
+        """
+        return {col_name: stats.summary() for col_name, stats in self.columns.items()}
+
+    def to_dict(self):
+        return {col_name: stats.to_dict() for col_name, stats in self.columns.items()}
+
+
+class StatsStore:
+    def __init__(self, conn, table_name="_table_stats"):
+        """
+        Initialize a store of table statistics kept in the database itself,
+        so they can be written in the same transaction as the data.
+
+        Args:
+            conn: Database connection
+            table_name (str): Table holding the serialized sketches
+        """
+        self.conn = conn
+        self.table_name = table_name
+        self.conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS "{self.table_name}" (
+                "table_name" VARCHAR,
+                "column_name" VARCHAR,
+                "stats" VARCHAR,
+                PRIMARY KEY ("table_name", "column_name")
+            )
+        """)
+
+    def table(self, name):
+        """
+        Load the statistics for a table.
+
+        Args:
+            name (str): Table name
+
+        Returns:
+            TableStats: Statistics for the table, empty if none were stored
+        """
+        rows = self.conn.execute(
+            f'SELECT "column_name", "stats" FROM "{self.table_name}" WHERE "table_name" = ?',
+            [name]
+        ).fetchall()
+        return TableStats({col_name: json.loads(data) for col_name, data in rows})
+
+    def save(self, name, stats):
+        """
+        Write the statistics for a table. Does not commit, so callers can
+        include it in the transaction that loaded the rows.
+
+        Args:
+            name (str): Table name
+            stats (TableStats): Statistics to store
+        """
+        self.conn.execute(f'DELETE FROM "{self.table_name}" WHERE "table_name" = ?', [name])
+        rows = [[name, col_name, json.dumps(data)] for col_name, data in stats.to_dict().items()]
+        if rows:
+            self.conn.executemany(f'INSERT INTO "{self.table_name}" VALUES (?, ?, ?)', rows)
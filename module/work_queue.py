@@ -0,0 +1,232 @@
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+
+class WorkQueue:
+    def __init__(self, path="work/queue.db", lease_seconds=60, max_attempts=3):
+        """
+        Initialize a SQLite backed work queue shared by worker processes.
+
+        Args:
+            path (str): Path of the SQLite database, on a filesystem shared
+                        by all workers
+            lease_seconds (int): How long a claimed task stays reserved
+                                 without renewal before another worker
+                                 may take it over
+            max_attempts (int): Attempts before a task is marked failed
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run_id TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    worker TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        """Open a connection in autocommit mode, transactions are explicit."""
+        conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def enqueue(self, run_id, payloads):
+        """
+        Add tasks to the queue.
+
+        Args:
+            run_id (str): Identifier grouping the tasks of one step execution
+            payloads (list): JSON serializable task descriptions
+
+        Returns:
+            int: Number of tasks added
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            conn.executemany(
+                "INSERT INTO tasks (run_id, payload, created_at) VALUES (?, ?, ?)",
+                [(run_id, json.dumps(payload), now) for payload in payloads]
+            )
+            conn.execute("COMMIT")
+        return len(payloads)
+
+    def claim(self, worker, run_id=None):
+        """
+        Atomically reserve the next pending task, or one whose lease expired.
+
+        Args:
+            worker (str): Identifier of the claiming worker
+            run_id (str): Only claim tasks of this run, any run if None
+
+        Returns:
+            tuple: (task_id, payload), or None if no task is available
+        """
+        now = time.time()
+        sql = ("SELECT id, payload FROM tasks "
+               "WHERE (status = 'pending' OR (status = 'running' AND lease_expires < ?))")
+        params = (now,)
+        if run_id is not None:
+            sql += " AND run_id = ?"
+            params = (now, run_id)
+        with self._connect() as conn:
+            # BEGIN IMMEDIATE takes the write lock, so only one worker claims a task
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(sql + " ORDER BY id LIMIT 1", params).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE tasks SET status = 'running', worker = ?, lease_expires = ?, "
+                "attempts = attempts + 1 WHERE id = ?",
+                (worker, now + self.lease_seconds, row[0])
+            )
+            conn.execute("COMMIT")
+        return row[0], json.loads(row[1])
+
+    def renew(self, task_id, worker):
+        """
+        Extend the lease of a task that is still being processed.
+
+        Args:
+            task_id (int): Task identifier
+            worker (str): Worker holding the task
+
+        Returns:
+            bool: False if the lease was lost to another worker
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET lease_expires = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (time.time() + self.lease_seconds, task_id, worker)
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, task_id, worker, result):
+        """
+        Mark a task as done.
+
+        Args:
+            task_id (int): Task identifier
+            worker (str): Worker holding the task
+            result (dict): JSON serializable task output
+
+        Returns:
+            bool: False if the lease was lost to another worker
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = 'done', result = ?, lease_expires = NULL "
+                "WHERE id = ? AND worker = ? AND status = 'running'",
+                (json.dumps(result), task_id, worker)
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, task_id, worker, error):
+        """
+        Record a failed attempt, re-queueing the task until max_attempts.
+
+        Args:
+            task_id (int): Task identifier
+            worker (str): Worker holding the task
+            error (str): Error message
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "error = ?, lease_expires = NULL WHERE id = ? AND worker = ?",
+                (self.max_attempts, error, task_id, worker)
+            )
+
+    def remaining(self, run_id=None):
+        """
+        Count tasks that are pending or still running.
+
+        Args:
+            run_id (str): Optionally restrict the count to one run
+
+        Returns:
+            int: Number of unfinished tasks
+        """
+        sql = "SELECT COUNT(*) FROM tasks WHERE status IN ('pending', 'running')"
+        params = ()
+        if run_id is not None:
+            sql += " AND run_id = ?"
+            params = (run_id,)
+        with self._connect() as conn:
+            return conn.execute(sql, params).fetchone()[0]
+
+    def results(self, run_id):
+        """
+        Get the tasks of a run with their status and output.
+
+        Args:
+            run_id (str): Run identifier
+
+        Returns:
+            list: Dictionaries with id, status, payload, result and error
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, status, payload, result, error FROM tasks WHERE run_id = ? ORDER BY id",
+                (run_id,)
+            ).fetchall()
+        return [
+            {
+                'id': task_id,
+                'status': status,
+                'payload': json.loads(payload),
+                'result': json.loads(result) if result else None,
+                'error': error,
+            }
+            for task_id, status, payload, result, error in rows
+        ]
+
+    def delete_run(self, run_id):
+        """
+        Remove all tasks of a run once its results were consumed.
+
+        Args:
+            run_id (str): Run identifier
+        """
+        with self._connect() as conn:
+            conn.execute("DELETE FROM tasks WHERE run_id = ?", (run_id,))
+
+    def stale_runs(self, max_age_seconds):
+        """
+        Find runs whose tasks were all enqueued longer ago than max_age_seconds,
+        e.g. left behind by a coordinator that died before merging.
+
+        Args:
+            max_age_seconds (float): Minimum age of a stale run
+
+        Returns:
+            list: Run identifiers
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT run_id FROM tasks GROUP BY run_id HAVING MAX(COALESCE(created_at, 0)) < ?",
+                (time.time() - max_age_seconds,)
+            ).fetchall()
+        return [row[0] for row in rows]
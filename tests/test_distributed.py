@@ -0,0 +1,115 @@
+import json
+import os
+import sys
+
+import pytest
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'module'))
+
+import distributed
+from duck_client import DuckClient
+from table import Table
+from table_stats import StatsStore, TableStats
+from work_queue import WorkQueue
+
+
+CONFIG = {
+    'name': "events",
+    'database': "demo",
+    'primary_key': "id",
+    'schema_definition': [["id", "INTEGER"], ["code", "VARCHAR"], ["amount", "DOUBLE"]],
+    'error_behavior': "skip",
+    'cluster_by': "id",
+}
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # Workers write shards under the relative work/ directory of the cwd
+    monkeypatch.chdir(tmp_path)
+    with open("table.yaml", 'w') as file:
+        yaml.safe_dump(CONFIG, file)
+    os.makedirs("data")
+    return tmp_path
+
+
+def write_data(name, rows):
+    with open(os.path.join("data", name), 'w') as file:
+        json.dump(rows, file)
+
+
+def merge(queue, run_id):
+    """Merge a run's shards into the table, as the table step does."""
+    client = DuckClient(CONFIG['database'])
+    conn = client.connect()
+    table = Table(name=CONFIG['name'], schema=CONFIG['schema_definition'], primary_key=CONFIG['primary_key'],
+                  error_behavior=CONFIG['error_behavior'], stats_store=StatsStore(conn))
+    table.create(conn)
+    loaded = 0
+    for task in queue.results(run_id):
+        result = task['result']
+        loaded += table.load_shard(conn, result['shard_path'], result['source_id'], result['row_count'],
+                                   shard_stats=TableStats(result['stats']))
+    distributed.cleanup_run(queue, run_id)
+
+    count = conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+    completed = table.completed_sources(conn)
+    stats = table.stats.summary()
+    client.close()
+    return loaded, count, completed, stats
+
+
+def test_process_shard_casts_values_to_the_schema(workdir):
+    # An integer in a VARCHAR column and a string in an INTEGER column
+    write_data("mixed.json", [{"id": 1, "code": 42, "amount": 1}, {"id": 2, "code": "a", "amount": 2.5},
+                              {"id": "x", "code": "b", "amount": 1}, {"id": 3, "code": None, "amount": None}])
+    payload = {'table': "table.yaml", 'data_path': "data/mixed.json", 'output_dir': "work/shards/test"}
+
+    result = distributed.process_shard(1, payload)
+
+    assert (result['row_count'], result['valid_count']) == (4, 3)
+    queue = WorkQueue("work/queue.db")
+    queue.enqueue("test", [payload])
+    task_id, _ = queue.claim("worker")
+    queue.complete(task_id, "worker", result)
+
+    loaded, count, completed, stats = merge(queue, "test")
+    assert (loaded, count) == (3, 3)
+    assert stats['code']['min'] == "42"
+    assert stats['amount']['max'] == 2.5
+
+
+def test_run_with_workers_merges_every_file_once(workdir):
+    for i in range(4):
+        write_data(f"part{i}.json", [{"id": i * 100 + j, "code": f"c{j % 3}", "amount": j} for j in range(50)])
+    # A duplicate key falls back to row-by-row inserts for its shard only
+    write_data("dup.json", [{"id": 1000, "code": "d", "amount": 1}, {"id": 1000, "code": "d", "amount": 2}])
+    queue = WorkQueue(str(workdir / "work" / "queue.db"))
+
+    assert distributed.run(queue, "run1", "table.yaml", "data/*.json", workers=2)
+    loaded, count, completed, stats = merge(queue, "run1")
+
+    assert (loaded, count) == (201, 201)
+    assert len(completed) == 5
+    assert stats['id']['row_count'] == 201
+    assert stats['id']['approx_distinct'] == 201
+    assert stats['code']['approx_distinct'] == 4
+    assert not os.path.exists(os.path.join("work", "shards", "run1"))
+
+    # Fully ingested files are not planned again
+    assert distributed.plan(queue, "run2", "table.yaml", "data/*.json") == 0
+    write_data("part4.json", [{"id": 500, "code": "c0", "amount": 1}])
+    assert distributed.run(queue, "run3", "table.yaml", "data/*.json", workers=2)
+    loaded, count, completed, stats = merge(queue, "run3")
+
+    assert (loaded, count) == (1, 202)
+    assert len(completed) == 6
+    assert stats['id']['row_count'] == 202
+
+
+def test_plan_rejects_remote_files(workdir):
+    queue = WorkQueue("work/queue.db")
+    with pytest.raises(ValueError):
+        distributed.plan(queue, "run", "table.yaml", "s3://bucket/data/*.json")
+    assert queue.results("run") == []
@@ -0,0 +1,41 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'module'))
+
+from duck_client import DuckClient
+from table import Table
+
+
+def test_maintain_compacts_churned_database(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    # A quote in the path must survive the ATTACH of the compaction target
+    client = DuckClient("team's")
+    conn = client.connect()
+    table = Table(name="events", schema=[["id", "INTEGER"], ["payload", "VARCHAR"]],
+                  primary_key="id", indexes=[{'columns': 'payload'}])
+    table.create(conn)
+
+    # Load and delete most of the rows, leaving free blocks behind
+    conn.execute("INSERT INTO events SELECT range, repeat('x', 200) || range FROM range(200000)")
+    client.checkpoint()
+    conn.execute("DELETE FROM events WHERE id >= 10000")
+    client.checkpoint()
+    size_before = os.path.getsize(client.db_path())
+
+    before, after, compacted = client.maintain(free_block_ratio=0.1)
+
+    assert compacted
+    assert after['file_size'] < size_before
+    assert after['free_block_ratio'] <= 0.1
+    assert os.path.exists(f"{client.db_path()}.maintenance.json")
+
+    conn = client.conn
+    assert conn.execute("SELECT COUNT(*) FROM events").fetchone()[0] == 10000
+    assert table.existing_primary_key(conn) == ["id"]
+    assert table.existing_indexes(conn) == {"idx_events_payload"}
+
+    # Recently compacted and nothing to reclaim, so the next run only checkpoints
+    assert not client.maintain(free_block_ratio=0.1)[2]
+    client.close()
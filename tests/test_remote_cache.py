@@ -0,0 +1,103 @@
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'module'))
+
+from remote_cache import RemoteCache
+
+
+class StubS3:
+    """In-memory stand-in for a boto3 S3 client, recording every call."""
+
+    def __init__(self):
+        self.objects = {}
+        self.calls = []
+
+    def put(self, key, data, etag):
+        self.objects[key] = (data, etag)
+
+    def head_object(self, Bucket, Key):
+        self.calls.append(('head', Key))
+        data, etag = self.objects[Key]
+        return {'ETag': f'"{etag}"', 'ContentLength': len(data)}
+
+    def get_object(self, Bucket, Key, Range, IfMatch):
+        self.calls.append(('get', Key))
+        data, etag = self.objects[Key]
+        if IfMatch != f'"{etag}"':
+            raise RuntimeError("PreconditionFailed")
+        start, end = (int(part) for part in Range[len("bytes="):].split('-'))
+        return {'Body': io.BytesIO(data[start:end + 1])}
+
+
+def make_cache(tmp_path, **kwargs):
+    cache = RemoteCache(str(tmp_path / "cache"), **kwargs)
+    s3 = StubS3()
+    cache._clients['s3'] = s3
+    return cache, s3
+
+
+def read(path):
+    with open(path, 'rb') as file:
+        return file.read()
+
+
+def test_cache_hit_only_stats_the_object(tmp_path):
+    cache, s3 = make_cache(tmp_path)
+    s3.put("data.json", b'[{"id": 1}]', "v1")
+
+    path = cache.fetch("s3://bucket/data.json")
+    assert path.endswith(".json")
+    assert read(path) == b'[{"id": 1}]'
+
+    s3.calls.clear()
+    assert cache.fetch("s3://bucket/data.json") == path
+    assert s3.calls == [('head', "data.json")]
+
+
+def test_changed_etag_downloads_again(tmp_path):
+    cache, s3 = make_cache(tmp_path)
+    s3.put("data.json", b'[{"id": 1}]', "v1")
+    cache.fetch("s3://bucket/data.json")
+
+    s3.put("data.json", b'[{"id": 2}]', "v2")
+    path = cache.fetch("s3://bucket/data.json")
+
+    assert read(path) == b'[{"id": 2}]'
+    assert ('get', "data.json") in s3.calls[-2:]
+    assert cache._load_index()["s3://bucket/data.json"]['version'] == "v2"
+
+
+def test_eviction_keeps_the_requested_entry(tmp_path):
+    # Room for one of the 600 KB files only
+    cache, s3 = make_cache(tmp_path, max_size_mb=1)
+    for key in ("a.json", "b.json"):
+        s3.put(key, b"x" * 600 * 1024, key)
+
+    first = cache.fetch("s3://bucket/a.json")
+    second = cache.fetch("s3://bucket/b.json")
+
+    assert not os.path.exists(first)
+    assert os.path.exists(second)
+    assert list(cache._load_index()) == ["s3://bucket/b.json"]
+
+    # A file larger than the cap is still returned, it is never evicted itself
+    s3.put("big.json", b"x" * 2 * 1024 * 1024, "big")
+    big = cache.fetch("s3://bucket/big.json")
+    assert os.path.exists(big)
+    assert list(cache._load_index()) == ["s3://bucket/big.json"]
+
+
+def test_parallel_ranges_reassemble_the_file(tmp_path):
+    # 1 KB threshold and ~100 byte ranges, with a short last range
+    cache, s3 = make_cache(tmp_path, range_threshold_mb=0.001, range_size_mb=0.0001, max_workers=4)
+    data = os.urandom(5000)
+    s3.put("part.parquet", data, "v1")
+
+    path = cache.fetch("s3://bucket/part.parquet")
+
+    assert read(path) == data
+    ranges = [call for call in s3.calls if call[0] == 'get']
+    assert len(ranges) == -(-len(data) // cache.range_size)
+    assert not [name for name in os.listdir(cache.cache_dir) if name.endswith('.part')]
@@ -0,0 +1,143 @@
+import os
+import sys
+
+import duckdb
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'module'))
+
+from table import Table
+
+
+class Crash(BaseException):
+    """Simulates the process dying, so no except Exception handler catches it."""
+
+
+def make_table(batch_size=4):
+    return Table(
+        name="events",
+        schema=[["id", "INTEGER"], ["region", "VARCHAR"]],
+        error_behavior="skip",
+        cluster_by="id",
+        batch_size=batch_size
+    )
+
+
+def test_resume_after_crash_during_row_fallback():
+    conn = duckdb.connect(":memory:")
+    table = make_table()
+    table.create(conn)
+
+    # Source order is the reverse of the cluster order, and row 1 is invalid
+    data = [{"id": 4, "region": "eu"}, {"id": "bad", "region": "us"},
+            {"id": 2, "region": "eu"}, {"id": 1, "region": "us"}]
+
+    commit_rows = table._commit_rows
+    calls = []
+
+    def failing_commit(conn, rows, source_id, row_offset, row_count=None):
+        calls.append(len(rows))
+        if len(rows) > 1:
+            # Force the row by row fallback
+            raise duckdb.Error("batch failed")
+        if len(calls) == 3:
+            raise Crash()
+        return commit_rows(conn, rows, source_id, row_offset, row_count)
+
+    table._commit_rows = failing_commit
+    with pytest.raises(Crash):
+        table.insert(conn, data, source_id="events.json")
+
+    # Only source row 0 was committed before the crash
+    assert table.get_checkpoint(conn, "events.json") == 1
+    assert table.completed_sources(conn) == set()
+    assert conn.execute("SELECT id FROM events").fetchall() == [(4,)]
+
+    resumed = make_table()
+    success, errors = resumed.insert(conn, data, source_id="events.json")
+
+    assert (success, errors) == (2, 1)
+    assert sorted(conn.execute("SELECT id FROM events").fetchall()) == [(1,), (2,), (4,)]
+    assert resumed.get_checkpoint(conn, "events.json") == len(data)
+    assert resumed.completed_sources(conn) == {"events.json"}
+
+
+def test_insert_skips_fully_ingested_source():
+    conn = duckdb.connect(":memory:")
+    table = make_table()
+    table.create(conn)
+    data = [{"id": i, "region": "eu"} for i in range(10)]
+
+    assert table.insert(conn, data, source_id="events.json") == (10, 0)
+    assert table.insert(conn, data, source_id="events.json") == (0, 0)
+    assert conn.execute("SELECT COUNT(*) FROM events").fetchone()[0] == 10
+
+
+def test_create_sql_with_composite_primary_key():
+    table = Table(name="sales", schema=[["region", "VARCHAR"], ["id", "INTEGER"]],
+                  primary_key=["region", "id"])
+
+    assert 'PRIMARY KEY ("region", "id")' in table.create_sql()
+
+    conn = duckdb.connect(":memory:")
+    table.create(conn)
+    conn.execute("INSERT INTO sales VALUES ('eu', 1), ('us', 1)")
+    with pytest.raises(duckdb.ConstraintException):
+        conn.execute("INSERT INTO sales VALUES ('eu', 1)")
+
+
+def test_create_indexes_is_idempotent():
+    conn = duckdb.connect(":memory:")
+    table = Table(name="customers", schema=[["id", "INTEGER"], ["email", "VARCHAR"]],
+                  primary_key="id", indexes=[{'columns': 'email', 'unique': True}])
+    table.create(conn)
+
+    assert table.existing_indexes(conn) == {"idx_customers_email"}
+    assert table.create_indexes(conn) == []
+
+
+def test_primary_key_drift_is_reported(capsys):
+    conn = duckdb.connect(":memory:")
+    Table(name="customers", schema=[["id", "INTEGER"], ["email", "VARCHAR"]], primary_key="id").create(conn)
+
+    table = Table(name="customers", schema=[["id", "INTEGER"], ["email", "VARCHAR"]],
+                  primary_key=["id", "email"])
+    assert table.create(conn)
+
+    assert "has primary key ['id'], table.yaml declares ['id', 'email']" in capsys.readouterr().out
+    assert table.existing_primary_key(conn) == ["id"]
+
+
+def test_cluster_rows_with_mixed_types_and_nulls():
+    table = Table(name="events", schema=[["code", "VARCHAR"], ["score", "INTEGER"]],
+                  cluster_by=["code", "score"])
+    rows = [{"code": None, "score": 1}, {"code": 10, "score": None},
+            {"code": "9", "score": 2}, {"code": 10, "score": 1}]
+
+    # Text columns order as text, NULLs last in every key column
+    assert table.cluster_rows(rows) == [
+        {"code": 10, "score": 1}, {"code": 10, "score": None},
+        {"code": "9", "score": 2}, {"code": None, "score": 1},
+    ]
+
+    # A non-text column holding mixed types falls back to text order
+    table = Table(name="events", schema=[["score", "INTEGER"]], cluster_by="score")
+    rows = [{"score": "b"}, {"score": None}, {"score": 3}]
+    assert table.cluster_rows(rows) == [{"score": 3}, {"score": "b"}, {"score": None}]
+
+
+def test_replace_with_query_keeps_primary_key():
+    conn = duckdb.connect(":memory:")
+    table = Table(name="sales", schema=[["region", "VARCHAR"], ["id", "INTEGER"]],
+                  primary_key=["region", "id"])
+    table.create(conn)
+
+    for _ in range(2):
+        count = table.replace_with_query(conn, "SELECT 'eu' AS region, range::INTEGER AS id FROM range(3)")
+    assert count == 3
+    assert table.existing_primary_key(conn) == ["region", "id"]
+
+    # Columns outside the schema are rejected and the table is left unchanged
+    with pytest.raises(duckdb.Error):
+        table.replace_with_query(conn, "SELECT 'eu' AS region, 1 AS id, 2 AS extra")
+    assert conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0] == 3
@@ -0,0 +1,135 @@
+import datetime
+import decimal
+import os
+import random
+import sys
+
+import duckdb
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'module'))
+
+from table import Table
+from table_stats import HyperLogLog, TDigest, TableStats, StatsStore
+
+
+@pytest.mark.parametrize("n", [10, 1000, 100000])
+def test_hyperloglog_accuracy(n):
+    sketch = HyperLogLog()
+    for i in range(n):
+        sketch.add(f"user-{i}")
+        sketch.add(f"user-{i}")
+
+    assert abs(sketch.count() - n) <= max(1, 0.05 * n)
+
+
+@pytest.mark.parametrize("n", [50, 100000])
+def test_tdigest_accuracy(n):
+    values = list(range(n))
+    random.Random(0).shuffle(values)
+    digest = TDigest()
+    for value in values:
+        digest.add(value)
+
+    for q in (0.01, 0.5, 0.95, 0.99):
+        assert abs(digest.quantile(q) - q * (n - 1)) <= 0.01 * n + 1
+    # Centroids grow with log(n), not n
+    assert len(digest.to_dict()['centroids']) <= max(n, 10 * digest.compression) // 10
+
+
+def make_rows(start, stop):
+    return [{"id": i, "name": f"n{i % 50}", "score": i / 10} for i in range(start, stop)]
+
+
+def test_merge_matches_single_pass():
+    full = TableStats()
+    full.update(make_rows(0, 5000))
+
+    merged = TableStats()
+    for start in range(0, 5000, 1000):
+        part = TableStats()
+        part.update(make_rows(start, start + 1000))
+        merged.merge(part)
+
+    for col_name, stats in full.columns.items():
+        other = merged.columns[col_name]
+        assert (other.row_count, other.null_count, other.min, other.max) == \
+               (stats.row_count, stats.null_count, stats.min, stats.max)
+        assert other.distinct.registers == stats.distinct.registers
+    assert merged.summary()['score']['p50'] == pytest.approx(full.summary()['score']['p50'], rel=0.01)
+
+
+def test_store_round_trip():
+    conn = duckdb.connect(":memory:")
+    store = StatsStore(conn)
+    stats = TableStats()
+    stats.update([{"id": 1, "day": datetime.date(2024, 1, 2), "amount": decimal.Decimal("1.50"), "note": None},
+                  {"id": 2, "day": datetime.date(2024, 3, 4), "amount": decimal.Decimal("7.25"), "note": "x"}])
+    store.save("events", stats)
+
+    loaded = store.table("events")
+    assert loaded.to_dict() == stats.to_dict()
+    assert loaded.summary()['day']['max'] == "2024-03-04"
+    assert store.table("other").columns == {}
+
+
+def test_from_table_matches_python_stats():
+    conn = duckdb.connect(":memory:")
+    schema = [["id", "INTEGER"], ["name", "VARCHAR"], ["amount", "DECIMAL(10,2)"],
+              ["active", "BOOLEAN"], ["day", "DATE"]]
+    conn.execute("CREATE TABLE events (id INTEGER, name VARCHAR, amount DECIMAL(10,2), active BOOLEAN, day DATE)")
+    conn.execute("""
+        INSERT INTO events
+        SELECT range, CASE WHEN range % 7 = 0 THEN NULL ELSE 'n' || (range % 300) END,
+               (range % 997) / 4, range % 3 = 0, DATE '2024-01-01' + (range % 400)::INTEGER
+        FROM range(20000)
+    """)
+
+    cursor = conn.execute("SELECT * FROM events")
+    columns = [desc[0] for desc in cursor.description]
+    expected = TableStats()
+    expected.update(dict(zip(columns, row)) for row in cursor.fetchall())
+
+    stats = TableStats.from_table(conn, "events", schema)
+
+    for col_name, _ in schema:
+        summary, expected_summary = stats.columns[col_name].summary(), expected.columns[col_name].summary()
+        for key in ('row_count', 'null_count', 'min', 'max', 'approx_distinct'):
+            assert summary[key] == expected_summary[key], (col_name, key)
+        # Registers match exactly, so sketches from both paths merge correctly
+        assert stats.columns[col_name].distinct.registers == expected.columns[col_name].distinct.registers
+    assert stats.summary()['amount']['p50'] == pytest.approx(expected.summary()['amount']['p50'], rel=0.02)
+    assert stats.summary()['name']['p50'] is None
+
+    conn.execute("DELETE FROM events")
+    empty = TableStats.from_table(conn, "events", schema)
+    assert empty.summary()['id']['row_count'] == 0
+
+
+def make_table(conn):
+    return Table(name="events", schema=[["id", "INTEGER"], ["region", "VARCHAR"]],
+                 primary_key="id", stats_store=StatsStore(conn))
+
+
+def test_stats_roll_back_with_failed_batch():
+    conn = duckdb.connect(":memory:")
+    table = make_table(conn)
+    table.create(conn)
+
+    # The duplicate key fails the batch, which is retried row by row
+    data = [{"id": 1, "region": "eu"}, {"id": 2, "region": "us"},
+            {"id": 2, "region": "eu"}, {"id": 3, "region": "us"}]
+    assert table.insert(conn, data, source_id="events.json") == (3, 1)
+
+    for stats in (table.stats, make_table(conn).stats):
+        summary = stats.summary()
+        assert summary['id']['row_count'] == 3
+        assert summary['id']['approx_distinct'] == 3
+        assert summary['region']['row_count'] == 3
+
+    # A failing materialization leaves the data and the stored stats unchanged
+    with pytest.raises(duckdb.Error):
+        table.replace_with_query(conn, "SELECT 1 AS id, 'eu' AS region UNION ALL SELECT 1, 'us'")
+    assert conn.execute("SELECT COUNT(*) FROM events").fetchone()[0] == 3
+    assert make_table(conn).stats.summary()['id']['row_count'] == 3
+    assert table.stats.summary()['id']['row_count'] == 3
@@ -0,0 +1,43 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'module'))
+
+from work_queue import WorkQueue
+
+
+def test_claim_is_scoped_to_run(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"))
+    queue.enqueue("old", [{'n': 1}])
+    queue.enqueue("new", [{'n': 2}])
+
+    task_id, payload = queue.claim("worker", run_id="new")
+    assert payload == {'n': 2}
+    assert queue.claim("worker", run_id="new") is None
+    assert queue.remaining("new") == 1
+
+
+def test_expired_lease_is_taken_over_unless_renewed(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"), lease_seconds=-1)
+    queue.enqueue("run", [{'n': 1}])
+
+    task_id, _ = queue.claim("dead")
+    assert queue.claim("alive", run_id="run")[0] == task_id
+
+    # The original worker lost its lease and can no longer complete the task
+    assert not queue.renew(task_id, "dead")
+    assert not queue.complete(task_id, "dead", {})
+    assert queue.complete(task_id, "alive", {'ok': True})
+
+
+def test_delete_run_and_stale_runs(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"))
+    queue.enqueue("a", [{'n': 1}])
+    queue.enqueue("b", [{'n': 2}])
+
+    assert sorted(queue.stale_runs(-1)) == ["a", "b"]
+    assert queue.stale_runs(3600) == []
+
+    queue.delete_run("a")
+    assert queue.results("a") == []
+    assert len(queue.results("b")) == 1